@@ -0,0 +1,29 @@
+"""
+Parse the YAML file providing defaults for Copier template questions.
+"""
+
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+try:
+    # Prefer the libyaml-backed loader when available
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+def load(data_file: Path) -> dict[str, Any]:
+    """
+    Load the data file. Raises ValueError if it does not exist
+    and TypeError if it does not contain a mapping.
+    """
+    try:
+        with open(data_file, encoding="utf-8") as fh:
+            data = yaml.load(fh, Loader=SafeLoader)
+    except FileNotFoundError as err:
+        raise ValueError("Passed data-file does not exist") from err
+    if not isinstance(data, dict):
+        raise TypeError("Passed data-file does not contain a mapping")
+    return data
@@ -0,0 +1,25 @@
+"""
+Helpers complementing :py:mod:`functools`.
+"""
+
+
+class unlocked_cached_property:  # pylint: disable=invalid-name
+    """
+    Like ``functools.cached_property``, but without the lock it acquires
+    on Python < 3.12. That lock is a single RLock per descriptor, shared by
+    all instances of the class. The migration is single-threaded.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        val = instance.__dict__[self.name] = self.func(instance)
+        return val
@@ -0,0 +1,40 @@
+"""
+On-disk cache for the dunder information of utils modules.
+
+Entries are keyed by a hash of the module source, so they stay valid
+regardless of where the module is installed.
+"""
+
+import json
+import os
+from pathlib import Path
+
+CACHE_FILE = "utils_info.json"
+CACHE_VERSION = 1
+
+
+def load(cache_dir: Path) -> dict[str, dict]:
+    """
+    Load cached entries. Returns an empty mapping if the cache is missing,
+    unreadable or was written by an incompatible version.
+    """
+    try:
+        with open(cache_dir / CACHE_FILE, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("entries") or {}
+
+
+def save(cache_dir: Path, entries: dict[str, dict]):
+    """
+    Atomically replace the cached entries.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_file = cache_dir / CACHE_FILE
+    tmp_file = cache_file.with_name(f"{CACHE_FILE}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as fh:
+        json.dump({"version": CACHE_VERSION, "entries": entries}, fh)
+    os.replace(tmp_file, cache_file)
@@ -1,12 +1,10 @@
 import argparse
 import sys
 
-from .migrate import ExtensionMigrate
 
-
-def main():
+def _build_parser():
     """
-    Prepare CLI args parser and hand off to DootiCLI
+    Prepare CLI args parser
     """
     parser = argparse.ArgumentParser(
         prog="saltext-migrate",
@@ -95,20 +93,58 @@ def main():
         dest="non_interactive",
         action="store_true",
     )
-    args = parser.parse_args()
-    if len(sys.argv[1:]) == 0:
+    parser.add_argument(
+        "--no-cache",
+        help=(
+            "Do not use or update the persistent caches (Copier template clone, "
+            "utils modules information, rewritten imports) in "
+            "`$XDG_CACHE_HOME/saltext-migrate`."
+        ),
+        dest="use_cache",
+        action="store_false",
+    )
+    return parser
+
+
+def _load_data_file(parser, data_file):
+    """
+    Parse the Copier data file once, before handing off to the migration
+    """
+    from ._data_file import load  # pylint: disable=import-outside-toplevel
+
+    try:
+        return load(data_file)
+    except (TypeError, ValueError) as err:
+        parser.error(str(err))
+
+
+def main():
+    """
+    Parse CLI args and hand off to ExtensionMigrate
+    """
+    parser = _build_parser()
+    if not sys.argv[1:]:
         parser.print_help()
         parser.exit()
     args = parser.parse_args()
+    data = None
+    if args.data_file is not None:
+        data = _load_data_file(parser, args.data_file)
+    # Importing the migration machinery is expensive (copier, bowler, plumbum...),
+    # avoid it when we just print help or exit due to invalid arguments.
+    from .migrate import ExtensionMigrate  # pylint: disable=import-outside-toplevel
+
     migration = ExtensionMigrate(
         saltext_name=args.saltext_name,
-        match=args.match,
+        # -m can be passed multiple times with multiple values each
+        match=[term for terms in args.match or () for term in terms],
         include=args.include,
         exclude=args.exclude,
         avoid_collisions=args.avoid_collisions,
         non_interactive=args.non_interactive,
-        data_file=args.data_file,
+        data=data,
         base_branch=args.base_branch or "3007.x",
         purge_reset=args.purge_reset,
+        use_cache=args.use_cache,
     )
     migration.execute()
@@ -1,24 +1,26 @@
 import fnmatch
+import mmap
 import os
 import re
 import shutil
+import tempfile
 from collections import defaultdict
 from dataclasses import dataclass, field
-from functools import cached_property
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Optional
 
 import copier
 import questionary
-import yaml
-from plumbum import TEE, local
+from plumbum import TEE, TF, local
 from plumbum.commands.processes import CommandNotFound, ProcessExecutionError
 
+from . import _data_file
+from ._functools import unlocked_cached_property
 from .rewrite import (
     DunderUtilsMigrationResult,
     rewrite_module_imports,
-    rewrite_patch_arglist,
-    rewrite_tests_support_imports,
+    rewrite_tests,
     rewrite_utils,
 )
 
@@ -27,7 +29,53 @@ SALTEXT_COPIER_URL = "https://github.com/salt-extensions/salt-extension-copier"
 RECOMMENDED_PYVER = "3.10"
 
 PRE_COMMIT_TEST_REGEX = re.compile(
-    r"^(?P<test>[^\n]+?)\.{4,}.*(?P<resolution>Failed|Passed|Skipped)$"
+    r"^(?P<test>[^\n]+?)\.{4,}.*(?P<resolution>Failed|Passed|Skipped)$",
+    re.MULTILINE,
+)
+
+ANALYSIS_FILES = (
+    Path(".git/filter-repo/analysis/path-all-sizes.txt"),
+    Path(".git/filter-repo/analysis/path-deleted-sizes.txt"),
+)
+ANALYSIS_HEAD_FILE = Path(".git/filter-repo/analysis/.head")
+
+# Paths matching the Saltext name that should never be migrated
+SKIP_PATHS_REGEX = re.compile(
+    r"^(\.github|doc/ref|debian/|doc/locale|doc/_themes|salt/([^/]+/)?__init__\.py|tests/(pytests/)?(unit|functional|integration)/conftest\.py)"
+)
+
+# Rename rules for migrated paths as (source prefix, target parts builder).
+# The first matching rule wins, `*` matches any single path component.
+MODULE_RENAME_RULES = (
+    # cloud modules are in salt/cloud/clouds
+    (("salt", "cloud"), lambda parts: parts[2:]),
+    # wrapper modules are in salt/client/ssh/wrapper
+    (("salt", "client", "ssh", "wrapper"), lambda parts: parts[3:]),
+    (("salt",), lambda parts: parts[1:]),
+)
+
+PYTEST_RENAME_RULES = (
+    # cloud tests are in tests/pytests/{unit,integration}/cloud/clouds,
+    # additionally drop `cloud`
+    (("tests", "pytests", "*", "cloud"), lambda parts: ("tests", parts[2], *parts[4:])),
+    # wrapper integration tests are in tests/pytests/integration/ssh,
+    # additionally rename `ssh` -> `wrapper`
+    (
+        ("tests", "pytests", "integration", "ssh"),
+        lambda parts: ("tests", "integration", "wrapper", *parts[4:]),
+    ),
+    # wrapper unit tests are in tests/pytests/unit/client/ssh/wrapper
+    (
+        ("tests", "pytests", "unit", "client", "ssh", "wrapper"),
+        lambda parts: ("tests", "unit", "wrapper", *parts[6:]),
+    ),
+    (("tests", "pytests"), lambda parts: ("tests", *parts[2:])),
+)
+
+NON_PYTEST_RENAME_RULES = (
+    # non-pytest cloud tests are in tests/{unit,integration}/cloud/clouds,
+    # drop `cloud`
+    (("tests", "*", "cloud"), lambda parts: ("tests", parts[1], *parts[3:])),
 )
 
 NON_IDEMPOTENT_HOOKS = (
@@ -43,6 +91,8 @@ NON_IDEMPOTENT_HOOKS = (
     "black",
     "blacken-docs",
 )
+# Matches any hook name starting with one of the above prefixes
+NON_IDEMPOTENT_HOOKS_REGEX = re.compile("|".join(map(re.escape, NON_IDEMPOTENT_HOOKS)))
 
 
 class TargetPathExists(ValueError):
@@ -51,6 +101,72 @@ class TargetPathExists(ValueError):
     """
 
 
+@lru_cache(maxsize=None)
+def _translate_glob(ptrn):
+    return fnmatch.translate(ptrn)
+
+
+def compile_globs(patterns):
+    """
+    Fuse path globs into a single compiled regular expression.
+    Returns None if no patterns were passed.
+    """
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{_translate_glob(ptrn)})" for ptrn in patterns))
+
+
+def apply_rename_rules(rules, parts):
+    """
+    Return the new path parts according to the first matching rule
+    or None if no rule matches.
+    """
+    for prefix, build in rules:
+        if len(parts) >= len(prefix) and all(
+            ptrn in ("*", part) for ptrn, part in zip(prefix, parts)
+        ):
+            return build(parts)
+    return None
+
+
+def dotted_name(posix_path):
+    """
+    Convert a relative POSIX path to a dotted module name.
+    """
+    return os.path.splitext(posix_path)[0].replace("/", ".")
+
+
+def file_contains(path, needle):
+    """
+    Check if a file contains a byte string without reading it into memory.
+    """
+    with open(path, "rb") as fh:
+        try:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped.find(needle) != -1
+        except ValueError:
+            # Empty files cannot be mapped
+            return False
+
+
+def user_cache_dir() -> Path:
+    """
+    Return the directory for persistent caches shared between migrations.
+    """
+    return (
+        Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+        / "saltext-migrate"
+    )
+
+
+def chunks(items, size):
+    """
+    Split a list into chunks of at most ``size`` items.
+    """
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
 def ask_yn(msg, default=False):
     return questionary.confirm(msg, default=default).ask()
 
@@ -61,12 +177,13 @@ def render_list(iterator, list_style="•", indent=2):
 
 
 def render_dict_list(mapping, list_style_1="=>", list_style_2="•", indent=2):
-    res = ""
+    pad = " " * indent
+    pad_val = " " * (indent + 2)
+    parts = []
     for key in sorted(mapping):
-        res += "\n" + " " * indent + list_style_1 + f" {key}:\n"
-        for val in sorted(mapping[key]):
-            res += " " * (indent + 2) + list_style_2 + f" {val}\n"
-    return res
+        parts.append(f"\n{pad}{list_style_1} {key}:\n")
+        parts.extend(f"{pad_val}{list_style_2} {val}\n" for val in sorted(mapping[key]))
+    return "".join(parts)
 
 
 def status(msg):
@@ -105,35 +222,23 @@ def summary(msg, warn=False, title=False, main_title=False):
 def parse_pre_commit(data):
     passing = []
     failing = {}
-    cur = None
-    for line in data.splitlines():
-        if match := PRE_COMMIT_TEST_REGEX.match(line):
-            cur = None
-            if match.group("resolution") != "Failed":
-                passing.append(match.group("test"))
-                continue
-            cur = match.group("test")
-            failing[cur] = []
-            continue
-        try:
-            failing[cur].append(line)
-        except KeyError:
-            # in case the parsing logic fails, let's not crash everything
+    matches = list(PRE_COMMIT_TEST_REGEX.finditer(data))
+    for i, match in enumerate(matches):
+        if match.group("resolution") != "Failed":
+            passing.append(match.group("test"))
             continue
-    return passing, {
-        test: "\n".join(output).strip() for test, output in failing.items()
-    }
+        # The output of a failing hook extends until the next hook result
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(data)
+        failing[match.group("test")] = data[match.end() : end].strip()
+    return passing, failing
 
 
-def check_pre_commit_rerun(data):
+def check_pre_commit_rerun(failing):
     """
     Check if we can expect failing hooks to turn green during a rerun.
+    Expects the failing hooks as returned by ``parse_pre_commit``.
     """
-    _, failing = parse_pre_commit(data)
-    for hook in failing:
-        if hook.startswith(NON_IDEMPOTENT_HOOKS):
-            return True
-    return False
+    return any(map(NON_IDEMPOTENT_HOOKS_REGEX.match, failing))
 
 
 @dataclass
@@ -148,6 +253,17 @@ class Migration:
         default_factory=DunderUtilsMigrationResult
     )
     failing_hooks: dict[str, str] = field(init=False)
+    modules: set[Path] = field(init=False, repr=False)
+    pytests: set[Path] = field(init=False, repr=False)
+    pytest_support: set[Path] = field(init=False, repr=False)
+    non_pytests: set[Path] = field(init=False, repr=False)
+    test_files: set[Path] = field(init=False, repr=False)
+    doc: set[Path] = field(init=False, repr=False)
+    _dir_cache: dict[Path, set[str]] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    _module_names: dict[Path, str] = field(init=False, repr=False)
+    _result_set: frozenset[Path] = field(init=False, repr=False)
 
     def __post_init__(self):
         self.renames = {}
@@ -155,53 +271,32 @@ class Migration:
         self.utils_dunder_missed = defaultdict(set)
         self.utils_dunder_rewrite = defaultdict(set)
         self.failing_hooks = {}
+        self._classify()
 
         # rename salt/modules/foo.py => src/saltext/foo/modules/foo.py
         for path in self.modules:
-            if path.parts[1] == "cloud":
-                # cloud modules are in salt/cloud/clouds
-                new_path = Path("src", "saltext", self.saltext_name, *path.parts[2:])
-            elif path.parts[1:3] == ("client", "ssh", "wrapper"):
-                # wrapper modules are in salt/client/ssh/wrapper
-                new_path = Path("src", "saltext", self.saltext_name, *path.parts[3:])
-            else:
-                new_path = Path("src", "saltext", self.saltext_name, *path.parts[1:])
-
-            self._rename(path, new_path)
+            self._rename(
+                path,
+                Path(
+                    "src",
+                    "saltext",
+                    self.saltext_name,
+                    *apply_rename_rules(MODULE_RENAME_RULES, path.parts),
+                ),
+            )
 
         # remove `pytest` subdirectory
         # eg tests/pytests/unit/modules/test_foo.py => tests/unit/modules/test_foo.py
         for path in self.pytests:
-            if path.parts[3] == "cloud":
-                # cloud tests are in tests/pytests/{unit,integration}/cloud/clouds,
-                # additionally drop `cloud`
-                new_path = Path("tests", path.parts[2], *path.parts[4:])
-            elif path.parts[:4] == ("tests", "pytests", "integration", "ssh"):
-                # wrapper integration tests are in tests/pytests/integration/ssh,
-                # additionally rename `ssh` -> `wrapper`
-                new_path = Path("tests", "integration", "wrapper", *path.parts[4:])
-            elif path.parts[:6] == (
-                "tests",
-                "pytests",
-                "unit",
-                "client",
-                "ssh",
-                "wrapper",
-            ):
-                # wrapper unit tests are in tests/pytests/unit/client/ssh/wrapper
-                new_path = Path("tests", "unit", "wrapper", *path.parts[6:])
-            else:
-                new_path = Path("tests", *path.parts[2:])
-            self._rename_potentially_colliding_test(path, new_path)
+            self._rename_potentially_colliding_test(
+                path, Path(*apply_rename_rules(PYTEST_RENAME_RULES, path.parts))
+            )
 
-        # non-pytest cloud tests are in tests/{unit,integration}/cloud/clouds,
-        # drop `cloud`
         for path in self.non_pytests:
-            if path.parts[2] != "cloud":
+            new_parts = apply_rename_rules(NON_PYTEST_RENAME_RULES, path.parts)
+            if new_parts is None:
                 continue
-            self._rename_potentially_colliding_test(
-                path, Path("tests", path.parts[1], *path.parts[3:])
-            )
+            self._rename_potentially_colliding_test(path, Path(*new_parts))
 
         # rename tests/support/pytest/mysql.py => tests/support/mysql.py
         for path in self.pytest_support:
@@ -211,8 +306,65 @@ class Migration:
         for path in self.doc:
             self._rename(path, Path("docs", *path.parts[1:]))
 
+    def _classify(self) -> None:
+        """
+        Sort the migrated paths into categories in a single pass.
+        """
+        self.modules = set()
+        self.pytests = set()
+        self.pytest_support = set()
+        self.non_pytests = set()
+        self.test_files = set()
+        self.doc = set()
+        self._module_names = {}
+        self._result_set = frozenset(self.result)
+
+        for path in self.result:
+            posix = path.as_posix()
+            if posix.startswith("salt/"):
+                self.modules.add(path)
+                self._module_names[path] = dotted_name(posix)
+            elif posix.startswith("doc/"):
+                self.doc.add(path)
+            elif posix.startswith("tests/"):
+                self.test_files.add(path)
+                if posix.startswith("tests/pytests/"):
+                    self.pytests.add(path)
+                elif posix.startswith("tests/support/pytest/"):
+                    self.pytest_support.add(path)
+                elif posix.endswith(".py") and posix.startswith(
+                    ("tests/unit/", "tests/integration/")
+                ):
+                    self.non_pytests.add(path)
+
+    def _path_exists(self, path: Path) -> bool:
+        """
+        Check if a path exists, listing each parent directory only once.
+        """
+        try:
+            entries = self._dir_cache[path.parent]
+        except KeyError:
+            try:
+                with os.scandir(path.parent) as scan:
+                    entries = {entry.name for entry in scan}
+            except (FileNotFoundError, NotADirectoryError):
+                entries = set()
+            self._dir_cache[path.parent] = entries
+        return path.name in entries
+
+    def _collides(self, new) -> bool:
+        """
+        Check if a rename target is an existing path that is migrated,
+        but has not been renamed itself.
+        """
+        return (
+            new in self._result_set
+            and new not in self.renames
+            and self._path_exists(new)
+        )
+
     def _rename(self, old, new) -> None:
-        if new in self.result and new.exists() and new not in self.renames:
+        if self._collides(new):
             raise TargetPathExists(new)
         if old == new:
             raise ValueError(f"This does not rename, {old} == {new}")
@@ -220,110 +372,76 @@ class Migration:
 
     def _rename_potentially_colliding_test(self, old, new) -> None:
         avoid_collisions = self.avoid_collisions
-        if not avoid_collisions:
-            try:
-                self._rename(old, new)
-            except TargetPathExists:
-                # This means there are still non-pytest tests at the same path
-                # we want to move some (potentially historic) pytest ones to.
-                # We cannot detect historic collisions reliably (those when
-                # both files existed together and were touched by the same commit),
-                # even filter-branch does not always detect it for some reason.
-                # Example mysql: tests/integration/modules/test_mysql.py still exists,
-                # tests/pytests/integration/modules/test_mysql.py existed at some point,
-                # but was converted to functional tests.
-                # A black update (6abb43d2dfc362643989ed9a856ae38cf9d4c61e) touched
-                # both paths.
-                self.conflicts[old] = new
-                avoid_collisions = True
+        if not avoid_collisions and self._collides(new):
+            # This means there are still non-pytest tests at the same path
+            # we want to move some (potentially historic) pytest ones to.
+            # We cannot detect historic collisions reliably (those when
+            # both files existed together and were touched by the same commit),
+            # even filter-branch does not always detect it for some reason.
+            # Example mysql: tests/integration/modules/test_mysql.py still exists,
+            # tests/pytests/integration/modules/test_mysql.py existed at some point,
+            # but was converted to functional tests.
+            # A black update (6abb43d2dfc362643989ed9a856ae38cf9d4c61e) touched
+            # both paths.
+            self.conflicts[old] = new
+            avoid_collisions = True
         if avoid_collisions:
             self._rename(new, new.with_stem(new.stem + "_old"))
             self._rename(old, new.with_stem(new.stem + "_pytest"))
+        else:
+            self._rename(old, new)
 
-    @cached_property
-    def pytests(self) -> set[Path]:
-        return set(filter(lambda x: x.parts[:2] == ("tests", "pytests"), self.result))
-
-    @cached_property
-    def pytest_support(self) -> set[Path]:
-        return set(
-            filter(lambda x: x.parts[:3] == ("tests", "support", "pytest"), self.result)
-        )
-
-    @cached_property
-    def non_pytests(self) -> set[Path]:
-        return set(
-            filter(
-                lambda x: x.suffix == ".py"
-                and x.parts[0] == "tests"
-                and x.parts[1] in ("unit", "integration"),
-                self.result,
-            )
-        )
-
-    @cached_property
-    def modules(self) -> set[Path]:
-        return set(filter(lambda x: x.parts[0] == "salt", self.result))
+    @unlocked_cached_property
+    def sorted_result(self) -> list[Path]:
+        return sorted(self.result)
 
-    @cached_property
+    @unlocked_cached_property
     def module_types(self) -> set[str]:
         res = set()
         for mod in self.modules:
-            res.add(mod.parts[1].rstrip("s"))
+            # src/saltext/<name>/<type>s/...
+            res.add(self.renames[mod].parts[3].rstrip("s"))
         return res
 
-    @cached_property
+    @unlocked_cached_property
     def module_imports(self) -> dict[str, str]:
         res = {}
-        for mod in self.modules:
+        for mod, name in self._module_names.items():
             # Example: res["salt.modules.mysql"] = "saltext.mysql.modules.mysql"
-            res[".".join(mod.with_suffix("").parts)] = ".".join(
-                self.renames[mod].with_suffix("").parts[1:]
-            )
+            # (the new path is prefixed with `src/`)
+            res[name] = dotted_name(self.renames[mod].as_posix()).split(".", 1)[1]
         return res
 
-    @cached_property
-    def test_files(self) -> set[Path]:
-        return set(filter(lambda x: x.parts[0] == "tests", self.result))
-
-    @cached_property
-    def doc(self) -> set[Path]:
-        return set(filter(lambda x: x.parts[0] == "doc", self.result))
-
-    @property
-    def args(self) -> tuple[str, ...]:
+    @unlocked_cached_property
+    def path_changes(self) -> tuple[str, ...]:
+        """
+        Path filters and renames in the format of ``git filter-repo --paths-from-file``
+        """
         res: list[str] = []
         for path in self.result:
-            res.extend(("--path", str(path)))
+            res.append(f"literal:{path}")
             if path in self.renames:
-                res.extend(("--path-rename", f"{path}:{self.renames[path]}"))
+                res.append(f"literal:{path}==>{self.renames[path]}")
         return tuple(res)
 
-    @property
+    @unlocked_cached_property
     def non_pytests_after_migration(self) -> set[Path]:
+        # Non-pytests that were replaced by pytests are not relevant
+        pytest_targets = {
+            self.renames[path] for path in self.pytests if path in self.renames
+        }
         res = set()
         for path in self.non_pytests:
-            if path in self.renames:
-                path = self.renames[path]
-            skip = True
-            for old_path, new_path in self.renames.items():
-                if new_path == path and old_path in self.pytests:
-                    break
-            else:
-                skip = False
-            if skip:
+            path = self.renames.get(path, path)
+            if path in pytest_targets:
                 continue
 
-            if (self.saltext_path / path).exists():
+            if self._path_exists(self.saltext_path / path):
                 res.add(path)
         return res
 
 
 git = local["git"]["-c", "commit.gpgsign=0"]
-grep = local["grep"]
-awk = local["awk"]
-sort = local["sort"]
-uniq = local["uniq"]
 
 
 @dataclass
@@ -334,12 +452,16 @@ class ExtensionMigrate:
     exclude: list[str] = field(default_factory=list)
     avoid_collisions: bool = False
     data_file: Optional[Path] = None
+    data: Optional[dict[str, Any]] = None
     non_interactive: bool = False
     base_branch: str = "3007.x"
     purge_reset: bool = False
+    use_cache: bool = True
     salt_path: Path = field(init=False)
     saltext_path: Path = field(init=False)
     _copier_data: dict[str, Any] = field(init=False, repr=False)
+    _include_re: Optional[re.Pattern] = field(init=False, repr=False)
+    _exclude_re: Optional[re.Pattern] = field(init=False, repr=False)
 
     def __post_init__(self):
         if self.data_file is not None:
@@ -347,6 +469,9 @@ class ExtensionMigrate:
         self._ensure_cwd()
         self.salt_path = Path(f"salt_{self.base_branch}").absolute()
         self.saltext_path = Path(f"saltext-{self.saltext_name}").absolute()
+        # Compile include/exclude globs once instead of per path and pattern
+        self._include_re = compile_globs(self.include)
+        self._exclude_re = compile_globs(self.exclude)
 
         copier_data = {
             "no_saltext_namespace": False,
@@ -356,13 +481,11 @@ class ExtensionMigrate:
         if self.non_interactive:
             copier_data["author"] = "Foo Bar"
             copier_data["author_email"] = "foo@b.ar"
-        if self.data_file is not None:
-            if not self.data_file.exists():
-                raise ValueError("Passed data-file does not exist")
-            custom_copier_data = yaml.safe_load(self.data_file.read_text())
-            if not isinstance(custom_copier_data, dict):
-                raise TypeError("Passed data-file does not contain a mapping")
-            copier_data.update(custom_copier_data)
+        if self.data is not None:
+            # The data file has been parsed by the caller already
+            copier_data.update(self.data)
+        elif self.data_file is not None:
+            copier_data.update(_data_file.load(self.data_file))
         self._copier_data = copier_data
 
     def _run(self, cmd, *args) -> tuple[int, str, str]:
@@ -388,13 +511,14 @@ class ExtensionMigrate:
             if needs_reset:
                 git("reset", "--hard", "HEAD^{/Initial purge of community extensions}^")
             try:
-                grep(
-                    "salt_factories.get_container",
-                    *filter(lambda x: x.exists(), res.test_files),
-                )
-                self._copier_data["test_containers"] = True
-            except ProcessExecutionError:
-                pass
+                for test_file in res.test_files:
+                    try:
+                        if file_contains(test_file, b"salt_factories.get_container"):
+                            self._copier_data["test_containers"] = True
+                            break
+                    except FileNotFoundError:
+                        # Historic paths are not present in the checkout
+                        continue
             finally:
                 if needs_reset:
                     # Always go back to the previous HEAD
@@ -405,8 +529,7 @@ class ExtensionMigrate:
         self._merge_filtered()
         self._create_venv()
         self._rewrite_module_imports(res)
-        self._rewrite_tests_support_imports(res)
-        self._rewrite_patch_arglist(res)
+        self._rewrite_tests(res)
         self._rewrite_utils(res)
         self._run_pre_commit(res)
         self._print_summary(res)
@@ -448,10 +571,8 @@ class ExtensionMigrate:
                 # in case we're on a filter-source branch
                 git("reset", "--hard", self.base_branch)
                 git("switch", self.base_branch)
-                try:
+                if self._branch_exists("filter-source"):
                     git("branch", "-D", "filter-source")
-                except ProcessExecutionError:
-                    pass
 
         if self.saltext_path.exists() and tuple(self.saltext_path.glob("*")):
             if not self.non_interactive and not ask_yn(
@@ -462,6 +583,24 @@ class ExtensionMigrate:
 
         self.saltext_path.mkdir(exist_ok=True)
 
+    def _branch_exists(self, name):
+        """
+        Check whether a branch exists in the Salt checkout without
+        spawning git for the common (loose/packed ref) cases.
+        """
+        git_dir = self.salt_path / ".git"
+        ref = f"refs/heads/{name}"
+        if (git_dir / "reftable").is_dir():
+            with local.cwd(self.salt_path):
+                return git["show-ref", "--verify", "--quiet", ref] & TF
+        if (git_dir / ref).is_file():
+            return True
+        try:
+            with open(git_dir / "packed-refs", encoding="utf-8") as fh:
+                return any(line.rstrip("\n").endswith(f" {ref}") for line in fh)
+        except FileNotFoundError:
+            return False
+
     def _filter(self) -> Migration:
         with local.cwd(self.salt_path):
             if not (self.salt_path / "rfcs" / "0004-dunder-runner.md").exists():
@@ -470,55 +609,31 @@ class ExtensionMigrate:
             status("Discovering related paths (historic and current)")
 
             git("switch", self.base_branch)
-            try:
+            if self._branch_exists("filter-source"):
                 git("branch", "-D", "filter-source")
-            except ProcessExecutionError:
-                pass
 
-            if not Path(".git/filter-repo/analysis/path-all-sizes.txt").exists():
+            # The analysis output is reused as long as the analyzed commit
+            # has not changed
+            head = git("rev-parse", "HEAD").strip()
+            try:
+                analyzed_head = ANALYSIS_HEAD_FILE.read_text().strip()
+            except FileNotFoundError:
+                analyzed_head = None
+            if analyzed_head != head:
+                status(
+                    "Did not find up-to-date `filter-repo --analyze` output. Regenerating..."
+                )
+                self._analyze(head)
+            try:
+                res = self._discover_paths()
+            except FileNotFoundError:
                 status(
                     "Did not find existing `filter-repo --analyze` output. Regenerating..."
                 )
-                self._run(git, "filter-repo", "--analyze")
+                self._analyze(head)
+                res = self._discover_paths()
             git("switch", "-c", "filter-source")
 
-            res: set[Path] = set()
-
-            for single in self.match or [self.saltext_name]:
-                cmd_chain = (
-                    grep[
-                        single,
-                        ".git/filter-repo/analysis/path-all-sizes.txt",
-                        ".git/filter-repo/analysis/path-deleted-sizes.txt",
-                    ]
-                    | awk["{print $NF}"]
-                    | sort
-                    | uniq
-                    | grep[
-                        "-vE",
-                        "^(.github|doc/ref|debian/|doc/locale|doc/_themes|salt/([^/]+/)?__init__.py|tests/(pytests/)?(unit|functional|integration)/conftest.py)",
-                    ]
-                )
-                res = res.union(map(Path, cmd_chain().splitlines()))
-
-            if self.include:
-                for src in (
-                    Path(".git/filter-repo/analysis/path-all-sizes.txt"),
-                    Path(".git/filter-repo/analysis/path-deleted-sizes.txt"),
-                ):
-                    for line in src.read_text().splitlines()[2:]:
-                        if any(
-                            fnmatch.fnmatch(
-                                src_path := re.split(r"\s+", line)[-1], ptrn
-                            )
-                            for ptrn in self.include
-                        ):
-                            res.add(Path(src_path))
-            if self.exclude:
-                for path in res.copy():
-                    if any(fnmatch.fnmatch(str(path), ptrn) for ptrn in self.exclude):
-                        res.remove(path)
-
             if not res:
                 raise RuntimeError("Did not find any matching paths")
 
@@ -543,18 +658,63 @@ class ExtensionMigrate:
                 avoid_collisions=self.avoid_collisions,
             )
 
+    def _analyze(self, head):
+        """
+        Run ``filter-repo --analyze`` and record the analyzed commit.
+        """
+        self._run(git, "filter-repo", "--analyze", "--force")
+        tmp_head_file = ANALYSIS_HEAD_FILE.with_name(".head.tmp")
+        tmp_head_file.write_text(head)
+        os.replace(tmp_head_file, ANALYSIS_HEAD_FILE)
+
+    def _discover_paths(self) -> set[Path]:
+        """
+        Read each ``filter-repo --analyze`` output file once and check all
+        match terms as well as include and exclude globs against the path
+        column in a single pass.
+        """
+        match = re.compile(
+            "|".join(map(re.escape, self.match or [self.saltext_name]))
+        ).search
+        include = self._include_re.match if self._include_re is not None else None
+        exclude = self._exclude_re.match if self._exclude_re is not None else None
+        paths: set[str] = set()
+        for src in ANALYSIS_FILES:
+            with open(src, encoding="utf-8", errors="replace") as fh:
+                # Skip the header
+                for _ in range(2):
+                    next(fh, None)
+                for line in fh:
+                    if not (fields := line.rsplit(maxsplit=1)):
+                        continue
+                    src_path = fields[-1]
+                    if exclude is not None and exclude(src_path):
+                        continue
+                    if (match(src_path) and not SKIP_PATHS_REGEX.match(src_path)) or (
+                        include is not None and include(src_path)
+                    ):
+                        paths.add(src_path)
+        return set(map(Path, paths))
+
     def _execute_filter(self, res: Migration):
         status("Filtering repository history in new branch `filter-source`")
 
         with local.cwd(self.salt_path):
-            self._run(
-                git,
-                "filter-repo",
-                "--refs",
-                "refs/heads/filter-source",
-                "--force",
-                *res.args,
-            )
+            # Passing thousands of --path arguments can exceed argv limits
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", prefix="saltext-migrate-", suffix=".txt"
+            ) as paths_file:
+                paths_file.write("\n".join(res.path_changes) + "\n")
+                paths_file.flush()
+                self._run(
+                    git,
+                    "filter-repo",
+                    "--refs",
+                    "refs/heads/filter-source",
+                    "--force",
+                    "--paths-from-file",
+                    paths_file.name,
+                )
             status("Trying to rebase for dropping empty commits. This can fail safely.")
             try:
                 self._run(
@@ -605,16 +765,67 @@ class ExtensionMigrate:
                 sorted(res.module_types.difference(("util",)))
             )
             # We want to create the venv ourselves, so skip the Copier automation.
+            template = SALTEXT_COPIER_URL
+            if self.use_cache:
+                template = str(self._copier_template())
             with local.env(SKIP_INIT_MIGRATE="1"):
                 copier.run_copy(
-                    SALTEXT_COPIER_URL,
+                    template,
                     unsafe=True,
                     data=copier_data,
                     defaults=self.non_interactive,
                     quiet=True,
                 )
-            for glob in ("tests/**/test_*.py", "src/**/*_mod.py"):
-                list(map(lambda x: x.unlink(), self.saltext_path.glob(glob)))
+            if self.use_cache:
+                self._fix_copier_src_path()
+            self._remove_template_examples()
+
+    def _copier_template(self) -> Path:
+        """
+        Return a local clone of the Copier template, which is kept in the
+        user cache directory to avoid cloning it from GitHub on each run.
+        """
+        cache = user_cache_dir() / "copier-template"
+        if not (cache / ".git").is_dir():
+            status("Caching Copier template")
+            shutil.rmtree(cache, ignore_errors=True)
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            git("clone", "--quiet", SALTEXT_COPIER_URL, str(cache))
+            return cache
+        with local.cwd(cache):
+            try:
+                git("fetch", "--quiet", "--tags", "--force", "origin")
+                git("reset", "--quiet", "--hard", "origin/HEAD")
+            except ProcessExecutionError as err:
+                warn(
+                    "Failed updating the cached Copier template, using it as-is",
+                    err.stderr,
+                )
+        return cache
+
+    def _fix_copier_src_path(self):
+        """
+        Point the Copier answers file to the upstream template instead
+        of the local cache, which keeps ``copier update`` working.
+        """
+        answers_file = self.saltext_path / ".copier-answers.yml"
+        if not answers_file.exists():
+            return
+        lines = answers_file.read_text().splitlines(keepends=True)
+        for i, line in enumerate(lines):
+            if line.startswith("_src_path:"):
+                lines[i] = f"_src_path: {SALTEXT_COPIER_URL}\n"
+        answers_file.write_text("".join(lines))
+
+    def _remove_template_examples(self):
+        """
+        Remove the example modules and tests rendered by the Copier template.
+        """
+        for top, prefix, suffix in (("tests", "test_", ".py"), ("src", "", "_mod.py")):
+            for dirpath, _, filenames in os.walk(self.saltext_path / top):
+                for filename in filenames:
+                    if filename.startswith(prefix) and filename.endswith(suffix):
+                        os.unlink(os.path.join(dirpath, filename))
 
     def _merge_filtered(self):
         status("Merging filtered repository history")
@@ -624,24 +835,30 @@ class ExtensionMigrate:
             git("fetch", "repo-source")
             git("merge", "repo-source/filter-source")
             git("remote", "rm", "repo-source")
-            for tag in git("tag").splitlines():
-                git("tag", "-d", tag)
+            for tags in chunks(git("tag").splitlines(), 512):
+                git("tag", "-d", *tags)
 
     def _rewrite_module_imports(self, res: Migration):
         status("Rewriting module imports")
-        rewrite_module_imports(self.saltext_path, self.saltext_name, res)
-
-    def _rewrite_tests_support_imports(self, res: Migration):
-        status("Rewriting tests.support imports")
-        rewrite_tests_support_imports(self.saltext_path, res)
+        rewrite_module_imports(
+            self.saltext_path,
+            self.saltext_name,
+            res,
+            cache_dir=user_cache_dir() if self.use_cache else None,
+        )
 
-    def _rewrite_patch_arglist(self, res: Migration):
-        status("Rewriting unittest.mock.patch() arglist")
-        rewrite_patch_arglist(self.saltext_path, res)
+    def _rewrite_tests(self, res: Migration):
+        status("Rewriting tests.support imports and unittest.mock.patch() arglist")
+        rewrite_tests(self.saltext_path, res)
 
     def _rewrite_utils(self, res: Migration):
         status("Rewriting __utils__")
-        res.dunder_utils_res = rewrite_utils(self.saltext_path, self.saltext_name, res)
+        res.dunder_utils_res = rewrite_utils(
+            self.saltext_path,
+            self.saltext_name,
+            res,
+            cache_dir=user_cache_dir() if self.use_cache else None,
+        )
 
         if res.dunder_utils_res.missed_critical:
             warn(
@@ -694,29 +911,29 @@ class ExtensionMigrate:
             self._run_in_venv("pip", "install", "-e", ".[dev,tests,docs]")
             self._run_in_venv("pre-commit", "install", "--install-hooks")
 
-    def _run_pre_commit(self, res):
-        def _run_pre_commit_loop(retries_left):
-            try:
-                self._run_in_venv("pre-commit", "run", "-a", force_non_interactive=True)
-            except ProcessExecutionError as err:
-                if retries_left > 0 and check_pre_commit_rerun(err.stdout):
-                    return _run_pre_commit_loop(retries_left - 1)
-                raise
-
+    def _run_pre_commit(self, res, retries=2):
         status(
             "Running pre-commit hooks against all files. This can take a minute, please be patient"
         )
 
-        try:
-            _run_pre_commit_loop(2)
-        except ProcessExecutionError as err:
-            _, failing = parse_pre_commit(err.stdout)
-            warn(
-                f"Pre-commit is failing. Please fix all ({len(failing)}) failing hooks"
-            )
-            for i, failing_hook in enumerate(failing):
-                warn(f"✗ Failing hook ({i + 1}): {failing_hook}", failing[failing_hook])
-            res.failing_hooks = failing
+        for attempt in range(retries + 1):
+            try:
+                self._run_in_venv("pre-commit", "run", "-a", force_non_interactive=True)
+                return
+            except ProcessExecutionError as err:
+                _, failing = parse_pre_commit(err.stdout)
+                if attempt < retries and check_pre_commit_rerun(failing):
+                    continue
+                warn(
+                    f"Pre-commit is failing. Please fix all ({len(failing)}) failing hooks"
+                )
+                for i, failing_hook in enumerate(failing):
+                    warn(
+                        f"✗ Failing hook ({i + 1}): {failing_hook}",
+                        failing[failing_hook],
+                    )
+                res.failing_hooks = failing
+                return
 
     def _run_in_venv(self, command, *args, force_non_interactive=False):
         venv_dir = self.saltext_path / ".venv"
@@ -746,7 +963,7 @@ class ExtensionMigrate:
         summary("➨ Migration summary", main_title=True)
 
         summary("→ Migrated paths", title=True)
-        for path in sorted(res.result):
+        for path in res.sorted_result:
             if path not in res.renames:
                 text = f"  = {path} [Keep]"
                 new_name = path
@@ -763,7 +980,7 @@ class ExtensionMigrate:
             if (
                 new_name in res.dunder_utils_res.missed_critical
                 or new_name in res.dunder_utils_res.rewrite
-                or ".".join(new_name.with_suffix("").parts[1:])
+                or dotted_name(new_name.as_posix()).partition(".")[2]
                 in res.dunder_utils_res.rewrite_mods
             ):
                 warn = True
@@ -856,7 +1073,5 @@ class ExtensionMigrate:
         # cleanup after ourselves, but leave the salt checkout for future migrations
         with local.cwd(self.salt_path):
             git("switch", self.base_branch)
-            try:
+            if self._branch_exists("filter-source"):
                 git("branch", "-D", "filter-source")
-            except ProcessExecutionError:
-                pass
@@ -7,81 +7,275 @@ This code is heavily based on salt-rewrite:
 """
 
 import ast
+import hashlib
+import os
+import re
+import shutil
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from importlib.metadata import version
+from itertools import repeat
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from bowler import SYMBOL, TOKEN, Query
 from bowler.types import Leaf, Node
-from fissix.fixer_util import Call, Dot, touch_import
+from fissix.fixer_util import Call, Dot, Name, touch_import
+
+from . import _utils_cache
+from ._functools import unlocked_cached_property
 
 if TYPE_CHECKING:
     from .migrate import Migration
 
 
-SALT_DUNDERS = (
-    "__active_provider_name__",
-    "__context__",
-    "__env__",
-    "__events__",
-    "__executors__",
-    "__grains__",
-    "__instance_id__",
-    "__jid_event__",
-    "__low__",
-    "__lowstate__",
-    "__master_opts__",
-    "__opts__",
-    "__pillar__",
-    "__proxy__",
-    "__reg__",
-    "__ret__",
-    "__runner__",
-    "__running__",
-    "__salt__",
-    "__salt_system_encoding__",
-    "__serializers__",
-    "__states__",
-    "__utils__",
+SALT_DUNDERS = frozenset(
+    {
+        "__active_provider_name__",
+        "__context__",
+        "__env__",
+        "__events__",
+        "__executors__",
+        "__grains__",
+        "__instance_id__",
+        "__jid_event__",
+        "__low__",
+        "__lowstate__",
+        "__master_opts__",
+        "__opts__",
+        "__pillar__",
+        "__proxy__",
+        "__reg__",
+        "__ret__",
+        "__runner__",
+        "__running__",
+        "__salt__",
+        "__salt_system_encoding__",
+        "__serializers__",
+        "__states__",
+        "__utils__",
+    }
 )
 
+# Matches __utils__["<module>.<function>"](...) calls
+DUNDER_UTILS_PATTERN = """
+(
+    dunder_call=power<
+        '__utils__'
+        trailer< '[' dunder_mod_func=any* ']' >
+        trailer< '(' function_arguments=any* ')' >
+        trailing=any*
+    >
+)
+"""
 
-def rewrite_module_imports(saltext_path: Path, saltext_name: str, res: "Migration"):
-    def _create_filter(mod, from_import=False):
-        def _filter_salt_from_imports(node, capture, filename):
-            match = (
-                f"from salt.{'.'.join(mod.split('.')[:-1])} import {mod.split('.')[-1]}"
-            )
-            return match in str(capture["node"])
+# Modules not containing any of these cannot provide dunder information
+DUNDER_INFO_BYTES_REGEX = re.compile(
+    b"|".join(
+        re.escape(dunder.encode())
+        for dunder in sorted((*SALT_DUNDERS, "__virtualname__"))
+    )
+)
 
-        def _filter_salt_imports(node, capture, filename):
-            return mod in str(capture["node"])
+# Below this number of modules to parse, a process pool is not worth it
+PARALLEL_SCAN_THRESHOLD = 32
+# Minimum number of files to rewrite per worker process
+PARALLEL_REWRITE_THRESHOLD = 32
+# Bump when the output of _rewrite_module_imports changes
+REWRITE_CACHE_VERSION = 1
 
-        if from_import:
-            return _filter_salt_from_imports
-        return _filter_salt_imports
 
-    query = Query([str(saltext_path / "src"), str(saltext_path / "tests")])
-    for mod_path in res.modules:
-        mod_parent = ".".join(mod_path.with_suffix("").parts[1:-1])
-        mod = ".".join(mod_path.with_suffix("").parts[1:])
-        for from_import in (False, True):
-            if from_import:
-                # Bowler does not recognize from imports otherwise
-                query = query.select_module(f"salt.{mod_parent}")
-            else:
-                query = query.select_module(f"salt.{mod}")
-            query = query.filter(_create_filter(mod, from_import))
-            if from_import:
-                query = query.rename(f"saltext.{saltext_name}.{mod_parent}")
-            else:
-                query = query.rename(f"saltext.{saltext_name}.{mod}")
+def _dotted_parts(name):
+    """
+    Split a dotted name into its names and dots, like the leaves of a ``dotted_name``.
+    """
+    parts = []
+    for part in name.split("."):
+        parts.extend((".", part))
+    return parts[1:]
+
+
+def _rename_module(module_name, old_name, new_name):
+    """
+    Rename a module name node captured by ``select_module`` in place.
+    Mirrors Bowler's ``Query.rename``, which can only be chained to
+    a selector for a single module.
+    """
+    if module_name.type == SYMBOL.dotted_name:
+        dp_old = _dotted_parts(old_name)
+        dp_new = _dotted_parts(new_name)
+        for old, new, leaf in zip(dp_old, dp_new, module_name.children):
+            if old != leaf.value:
+                break
+            if old != new:
+                leaf.replace(Name(new, prefix=leaf.prefix))
+        if len(dp_new) < len(dp_old):
+            for child in module_name.children[len(dp_new) : len(dp_old)]:
+                child.remove()
+        else:
+            for i in range(len(dp_old), len(dp_new)):
+                module_name.insert_child(i, Name(dp_new[i]))
+    elif module_name.type == SYMBOL.power:
+        # power< 'salt' trailer< '.' NAME >* ... >
+        dp_old = old_name.split(".")
+        dp_new = new_name.split(".")
+        for old, new, child in zip(dp_old, dp_new, module_name.children):
+            name_leaf = child.children[1] if isinstance(child, Node) else child
+            if old != name_leaf.value:
+                break
+            name_leaf.replace(Name(new, prefix=name_leaf.prefix))
+        if len(dp_new) < len(dp_old):
+            for child in module_name.children[len(dp_new) : len(dp_old)]:
+                child.remove()
+        else:
+            for i in range(len(dp_old), len(dp_new)):
+                module_name.insert_child(
+                    i, Node(SYMBOL.trailer, [Dot(), Name(dp_new[i])])
+                )
+
+
+def _module_parts(node):
+    """
+    Return the leading dotted name parts of a node captured by ``select_module``.
+    """
+    if isinstance(node, Leaf):
+        return (node.value,)
+    if node.type == SYMBOL.dotted_name:
+        return tuple(leaf.value for leaf in node.children if leaf.type == TOKEN.NAME)
+    # power< [TOKEN] 'salt' trailer< '.' NAME >* ... >
+    parts = []
+    for child in node.children:
+        if not parts:
+            if isinstance(child, Leaf) and child.value == "salt":
+                parts.append(child.value)
+        elif child.type == SYMBOL.trailer and child.children[0].value == ".":
+            parts.append(child.children[1].value)
+        else:
+            break
+    return tuple(parts)
+
+
+def _rewrite_module_imports(paths, saltext_name, renames, children):
+    """
+    Rewrite imports of migrated modules in ``paths``. Needs to be
+    a module-level function to be usable with a process pool.
+    """
+
+    def _rename_salt_imports(node, capture, filename):
+        module_name = capture["module_name"]
+        parts = _module_parts(module_name)
+        for i in range(len(parts), 1, -1):
+            if parts[:i] in renames:
+                _rename_module(module_name, ".".join(parts[:i]), renames[parts[:i]])
+                return
+        if node.type != SYMBOL.import_from or parts not in children:
+            return
+        # `from salt.<parent> import <mod>` requires renaming the parent
+        parent = ".".join(parts)
+        node_str = str(node)
+        for mod in children[parts]:
+            if f"from {parent} import {mod}" in node_str:
+                new_parent = f"saltext.{saltext_name}.{'.'.join(parts[1:])}"
+                _rename_module(module_name, parent, new_parent)
+                return
+
+    query = Query(paths)
+    query = query.select_module("salt")
+    query = query.modify(_rename_salt_imports)
     query.execute(write=True, interactive=False, silent=False)
 
 
-def rewrite_tests_support_imports(saltext_path: Path, res: "Migration"):
-    query = Query([str(saltext_path / "tests")])
+def _restore_rewrites(cache_dir, paths, renames):
+    """
+    Restore files that were rewritten with the same renames before.
+    Returns the cache keys of all paths and the paths still to rewrite.
+    """
+    # Rewrites depend on this module and the installed Bowler/fissix as well
+    versions = (REWRITE_CACHE_VERSION, version("bowler"), version("fissix"))
+    renames_hash = hashlib.sha1(
+        repr((versions, sorted(renames.items()))).encode()
+    ).digest()
+    keys = {}
+    missing = []
+    for path in paths:
+        source = Path(path).read_bytes()
+        key = keys[path] = hashlib.sha1(source + b"\0" + renames_hash).hexdigest()
+        try:
+            shutil.copyfile(cache_dir / f"{key}.py", path)
+        except FileNotFoundError:
+            missing.append(path)
+    return keys, missing
+
+
+def _store_rewrites(cache_dir, keys, rewritten):
+    """
+    Store rewritten files and drop cache entries that were not used.
+    Temporary files may belong to a concurrent run and are left alone.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for path in rewritten:
+        with tempfile.NamedTemporaryFile(
+            dir=cache_dir, suffix=".tmp", delete=False
+        ) as tmp_file:
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, tmp_file)
+        os.replace(tmp_file.name, cache_dir / f"{keys[path]}.py")
+    used = {f"{key}.py" for key in keys.values()}
+    for entry in os.scandir(cache_dir):
+        if entry.name not in used and not entry.name.endswith(".tmp"):
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                # Pruned by a concurrent run
+                pass
+
+
+def rewrite_module_imports(
+    saltext_path: Path,
+    saltext_name: str,
+    res: "Migration",
+    cache_dir: Optional[Path] = None,
+):
+    # Instead of one selector per migrated module, select everything
+    # below `salt` once and look up the renames per matched node.
+    renames = {}
+    children = defaultdict(set)
+    for mod_path in res.modules:
+        mod_parts = ("salt", *mod_path.with_suffix("").parts[1:])
+        renames[mod_parts] = f"saltext.{saltext_name}.{'.'.join(mod_parts[1:])}"
+        children[mod_parts[:-1]].add(mod_parts[-1])
+
+    paths = [
+        str(path)
+        for top in ("src", "tests")
+        for path in sorted((saltext_path / top).rglob("*.py"))
+    ]
+    if cache_dir is not None:
+        cache_dir = cache_dir / "rewrites" / saltext_name
+        keys, paths = _restore_rewrites(cache_dir, paths, renames)
+    # Bowler would default to the current working directory without paths
+    if paths:
+        workers = min(os.cpu_count() or 1, len(paths) // PARALLEL_REWRITE_THRESHOLD)
+        if workers < 2:
+            _rewrite_module_imports(paths, saltext_name, renames, children)
+        else:
+            # Bowler always runs in-process, so rewrite shards of files in parallel
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(
+                    _rewrite_module_imports,
+                    (paths[i::workers] for i in range(workers)),
+                    repeat(saltext_name),
+                    repeat(renames),
+                    repeat(children),
+                ):
+                    pass
+    if cache_dir is not None:
+        _store_rewrites(cache_dir, keys, paths)
+
+
+def _select_tests_support_imports(query: Query, res: "Migration") -> Query:
     query = query.select_module("tests.support.mock")
     query = query.rename("unittest.mock")
 
@@ -91,81 +285,110 @@ def rewrite_tests_support_imports(saltext_path: Path, res: "Migration"):
             continue
         old_mod = ".".join(mod_path.with_suffix("").parts)
         new_mod = ".".join(res.renames[mod_path].with_suffix("").parts)
-        query.select_root()
         query = query.select_module(old_mod)
         query = query.rename(new_mod)
+    return query
 
-    query.execute(write=True, interactive=False, silent=False)
 
+def _select_patch_arglist(query: Query, res: "Migration") -> Query:
+    if not res.module_imports:
+        return query
+    # Prefer the longest match for module names sharing a prefix
+    module_imports_regex = re.compile(
+        "|".join(map(re.escape, sorted(res.module_imports, key=len, reverse=True)))
+    )
+
+    def _replace_module_import(match):
+        return res.module_imports[match.group(0)]
 
-def rewrite_patch_arglist(saltext_path: Path, res: "Migration"):
     def _filter_salt_imports(node, capture, filename):
-        node = str(capture["node"])
-        return any(match in node for match in res.module_imports)
+        return module_imports_regex.search(str(capture["node"])) is not None
 
     def _replace_patch_arglist(node, capture, filename):
-        if hasattr(node, "children"):
-            for child in node.children:
-                if hasattr(child, "children") and child.children:
-                    for _child in child.children:
-                        if hasattr(_child, "children") and _child.children:
-                            for __child in _child.children:
-                                if hasattr(__child, "value"):
-                                    try:
-                                        old_import = next(
-                                            x
-                                            for x in res.module_imports
-                                            if x in __child.value
-                                        )
-                                    except StopIteration:
-                                        continue
-                                    __child.value = __child.value.replace(
-                                        old_import, res.module_imports[old_import]
-                                    )
-                        elif hasattr(_child, "value"):
-                            try:
-                                old_import = next(
-                                    x for x in res.module_imports if x in _child.value
-                                )
-                            except StopIteration:
-                                continue
-                            _child.value = _child.value.replace(
-                                old_import, res.module_imports[old_import]
-                            )
+        stack = [node]
+        while stack:
+            child = stack.pop()
+            if not isinstance(child, Leaf):
+                stack.extend(child.children)
+                continue
+            new_value = module_imports_regex.sub(_replace_module_import, child.value)
+            if new_value != child.value:
+                child.value = new_value
 
-    query = Query([str(saltext_path / "tests")])
     query = query.select_function("patch")
     query = query.filter(_filter_salt_imports)
     query = query.modify(_replace_patch_arglist)
     # Also replace in patch.dict.
-    query = query.select_root()
     query = query.select_method("dict")
     query = query.filter(_filter_salt_imports)
     query = query.modify(_replace_patch_arglist)
     # patch.object is rewritten by rewrite_module_imports above
+    return query
+
+
+def rewrite_tests(saltext_path: Path, res: "Migration"):
+    """
+    Rewrite tests.support imports and unittest.mock.patch() arglists
+    in a single pass over the tests.
+    """
+    query = Query([str(saltext_path / "tests")])
+    query = _select_tests_support_imports(query, res)
+    query = _select_patch_arglist(query, res)
     query.execute(write=True, interactive=False, silent=False)
 
 
-class DunderParser(ast.NodeTransformer):  # pylint: disable=missing-class-docstring
-    # pylint: disable=missing-function-docstring,invalid-name
+class DunderParser:
+    """
+    Check a module for the usage of Salt dunders and its ``__virtualname__``.
+    """
+
     def __init__(self):
         self.virtualname = None
         self.uses_salt_dunders = False
 
-    def visit_Name(self, node):
-        if node.id in SALT_DUNDERS:
-            self.uses_salt_dunders = True
-        return self.generic_visit(node)
-
-    def visit_Assign(self, node):
-        for target in node.targets:
-            if not isinstance(target, ast.Name):
-                continue
-            if target.id == "__virtualname__":
-                self.virtualname = node.value.s
-        return self.generic_visit(node)
-
-    # pylint: enable=missing-function-docstring,invalid-name
+    def scan(self, tree, find_virtualname=True):
+        """
+        Walk the tree iteratively in source order, avoiding the
+        per-node recursion of ``ast.NodeVisitor``. The last assignment
+        to ``__virtualname__`` wins, so the walk can only stop early
+        if there is no virtualname to find.
+        """
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            node_type = type(node)
+            if node_type is ast.Name:
+                if node.id in SALT_DUNDERS:
+                    self.uses_salt_dunders = True
+                    if not find_virtualname:
+                        return
+            elif node_type is ast.Assign:
+                for target in node.targets:
+                    if (
+                        isinstance(target, ast.Name)
+                        and target.id == "__virtualname__"
+                        and isinstance(node.value, ast.Constant)
+                    ):
+                        self.virtualname = node.value.value
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend(children)
+
+
+def _scan_module(source):
+    """
+    Return the dunder information of a single module. Needs to be
+    a module-level function to be usable with a process pool.
+    """
+    if not DUNDER_INFO_BYTES_REGEX.search(source):
+        # Avoid parsing modules that cannot contain relevant names
+        return {"virtualname": None, "uses_salt_dunders": False}
+    transformer = DunderParser()
+    transformer.scan(ast.parse(source), find_virtualname=b"__virtualname__" in source)
+    return {
+        "virtualname": transformer.virtualname,
+        "uses_salt_dunders": transformer.uses_salt_dunders,
+    }
 
 
 def _get_salt_code_root():
@@ -176,6 +399,14 @@ def _defaultdict_factory():
     return defaultdict(set)
 
 
+def _group_by_mod(mapping):
+    res = defaultdict(set)
+    for path, mods in mapping.items():
+        for mod in mods:
+            res[mod].add(path)
+    return dict(res)
+
+
 @dataclass
 class DunderUtilsMigrationResult:
     # __utils__ used to call Salt core utils depending on dunders from non-utils Saltext modules
@@ -190,41 +421,32 @@ class DunderUtilsMigrationResult:
     # new arguments requires refactoring.
     _rewrite: dict[Path, set[str]] = field(default_factory=_defaultdict_factory)
 
-    @property
+    # The views below are cached, so they must only be accessed
+    # after the rewrite has finished.
+
+    @unlocked_cached_property
     def missed(self):
         return {k: v for k, v in self._missed.items() if v}
 
-    @property
+    @unlocked_cached_property
     def missed_mods(self):
-        res = defaultdict(set)
-        for path, mods in self._missed.items():
-            for mod in mods:
-                res[mod].add(path)
-        return dict(res)
+        return _group_by_mod(self._missed)
 
-    @property
+    @unlocked_cached_property
     def missed_critical(self):
         return {k: v for k, v in self._missed_critical.items() if v}
 
-    @property
+    @unlocked_cached_property
     def missed_critical_mods(self):
-        res = defaultdict(set)
-        for path, mods in self._missed_critical.items():
-            for mod in mods:
-                res[mod].add(path)
-        return dict(res)
+        return _group_by_mod(self._missed_critical)
 
-    @property
+    @unlocked_cached_property
     def rewrite(self):
         return {k: v for k, v in self._rewrite.items() if v}
 
-    @property
+    @unlocked_cached_property
     def rewrite_mods(self):
-        res = defaultdict(set)
-        for path, mods in self._rewrite.items():
-            for mod in mods:
-                res[mod].add(path)
-        return dict(res)
+        return _group_by_mod(self._rewrite)
 
 
 @dataclass
@@ -232,7 +454,10 @@ class UtilsMigrator:
     saltext_name: str
     saltext_path: Path
     res: "Migration"
+    cache_dir: Optional[Path] = None
     utils_info: dict[Path, dict] = field(init=False, repr=False)
+    _utils_by_import: dict[str, dict] = field(init=False, repr=False)
+    _utils_by_virtualname: dict[tuple[bool, str], dict] = field(init=False, repr=False)
     _salt_base_path: Path = field(init=False)
     _salt_utils_path: Path = field(init=False)
     _saltext_base_path: Path = field(init=False)
@@ -240,6 +465,12 @@ class UtilsMigrator:
     _utils_res: DunderUtilsMigrationResult = field(
         default_factory=DunderUtilsMigrationResult
     )
+    _details_cache: dict[str, dict] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    _rel_cache: dict[str, tuple[Path, bool]] = field(
+        init=False, repr=False, default_factory=dict
+    )
 
     def __post_init__(self):
         self._salt_base_path = (
@@ -252,52 +483,85 @@ class UtilsMigrator:
             self._saltext_base_path / "saltext" / self.saltext_name / "utils"
         )
         self.utils_info = self._get_utils_module_info()
+        self._utils_by_import = {}
+        self._utils_by_virtualname = {}
+        for info in self.utils_info.values():
+            self._utils_by_import[info["import"]] = info
+            # The first module found for a virtualname wins
+            self._utils_by_virtualname.setdefault(
+                (info["migrated"], info["virtualname"]), info
+            )
 
     def _get_utils_module_info(self):
         """
         Collect utils modules dunder information.
         """
-        mapping = {}
+        cache = _utils_cache.load(self.cache_dir) if self.cache_dir else {}
+        modules = []
+        missing = {}
         for base_path, utils_path in (
             (self._salt_base_path, self._salt_utils_path),
             (self._saltext_base_path, self._saltext_utils_path),
         ):
             for path in utils_path.rglob("*.py"):
-                transformer = DunderParser()
-                tree = ast.parse(path.read_text())
-                transformer.visit(tree)
-                mapping[path.resolve()] = {
-                    "modname": path.stem,
-                    "virtualname": transformer.virtualname or path.stem,
-                    "uses_salt_dunders": transformer.uses_salt_dunders,
-                    "migrated": self._saltext_base_path in path.parents,
-                    "import": ".".join(
-                        path.relative_to(base_path).with_suffix("").parts
-                    ),
-                }
+                source = path.read_bytes()
+                key = hashlib.sha1(source).hexdigest()
+                if key not in cache:
+                    missing[key] = source
+                modules.append((base_path, path, key))
+
+        # Parsing is CPU-bound, spread it over multiple processes
+        # unless there are only a few modules to parse.
+        if len(missing) < PARALLEL_SCAN_THRESHOLD:
+            scanned = map(_scan_module, missing.values())
+            cache.update(zip(missing, scanned))
+        else:
+            with ProcessPoolExecutor() as executor:
+                scanned = executor.map(_scan_module, missing.values(), chunksize=16)
+                cache.update(zip(missing, scanned))
+
+        mapping = {}
+        # Only keep entries for modules that are still present
+        seen = {}
+        for base_path, path, key in modules:
+            info = seen[key] = cache[key]
+            mapping[path.resolve()] = {
+                "modname": path.stem,
+                "virtualname": info["virtualname"] or path.stem,
+                "uses_salt_dunders": info["uses_salt_dunders"],
+                "migrated": self._saltext_base_path in path.parents,
+                "import": ".".join(path.relative_to(base_path).with_suffix("").parts),
+            }
+        if self.cache_dir and (missing or len(seen) != len(cache)):
+            _utils_cache.save(self.cache_dir, seen)
         return mapping
 
     def get_utils_module_details(self, name):
         """
         Return utils module details.
         """
-        full_saltext_module_name = f"saltext.{self.saltext_name}.utils.{name}"
-        full_module_name = f"salt.utils.{name}"
-        for base_path, full_name in (
-            (self._saltext_base_path, full_saltext_module_name),
-            (self._salt_base_path, full_module_name),
+        try:
+            return self._details_cache[name]
+        except KeyError:
+            pass
+        details = self._details_cache[name] = self._find_utils_module_details(name)
+        return details
+
+    def _find_utils_module_details(self, name):
+        modname = name.split(".")[0]
+        for migrated, full_name in (
+            (True, f"saltext.{self.saltext_name}.utils.{name}"),
+            (False, f"salt.utils.{name}"),
         ):
-            full_module_path = (
-                base_path / Path(*full_module_name.split(".")).with_suffix(".py")
-            ).resolve()
-            if full_module_path.exists():
-                return self.utils_info[full_module_path]
-            modname = name.split(".")[0]
-            for modpath, entry in self.utils_info.items():
-                if base_path in modpath.parents and entry["virtualname"] == modname:
-                    return entry
+            if (details := self._utils_by_import.get(full_name)) is not None:
+                return details
+            if (
+                details := self._utils_by_virtualname.get((migrated, modname))
+            ) is not None:
+                return details
         raise RuntimeError(
-            f"Could not find the python module for {name!r} and '{full_module_path}' does not exist"
+            f"Could not find the python module for {name!r} and "
+            f"'{self._salt_utils_path / name}.py' does not exist"
         )
 
     def fix_dunder_utils_calls(self, node, capture, filename):
@@ -310,25 +574,27 @@ class UtilsMigrator:
 
         utils_module, utils_module_funcname = dunder_mod_func.split(".")
         details = self.get_utils_module_details(utils_module)
+        utils_import = details["import"]
         if details["uses_salt_dunders"]:
+            try:
+                rel_path, in_utils = self._rel_cache[filename]
+            except KeyError:
+                rel_path = Path(filename).relative_to(self.saltext_path)
+                # src/saltext/<name>/<type>/...
+                in_utils = rel_path.parts[3] == "utils"
+                self._rel_cache[filename] = (rel_path, in_utils)
+            utils_res = self._utils_res
             if not details["migrated"]:
-                tgt = "_missed"
-                if (
-                    Path(filename).relative_to(self._saltext_base_path).parts[2]
-                    == "utils"
-                ):
-                    tgt = "_missed_critical"
-                getattr(self._utils_res, tgt)[
-                    Path(filename).relative_to(self.saltext_path)
-                ].add(details["import"])
+                if in_utils:
+                    utils_res._missed_critical[rel_path].add(utils_import)
+                else:
+                    utils_res._missed[rel_path].add(utils_import)
                 return  # Don't rewrite this, we can't influence Salt core
             # Partially rewrite calls to migrated utils depending on global dunders
-            self._utils_res._rewrite[Path(filename).relative_to(self.saltext_path)].add(
-                details["import"]
-            )
+            utils_res._rewrite[rel_path].add(utils_import)
 
         # Make sure we import the right utils module
-        touch_import(None, details["import"], node)
+        touch_import(None, utils_import, node)
 
         # Un-parent the function arguments so we can add them to a new call
         for leaf in capture["function_arguments"]:
@@ -345,7 +611,7 @@ class UtilsMigrator:
         )
 
         trailer = []
-        parts = details["import"].split(".")
+        parts = utils_import.split(".")
         for part in parts[1:]:
             trailer.extend((Dot(), Leaf(TOKEN.NAME, part, prefix="")))
         trailer.extend((Dot(), call_node))
@@ -366,25 +632,24 @@ class UtilsMigrator:
         node.replace(replacement)
 
 
-def rewrite_utils(saltext_path: Path, saltext_name: str, res: "Migration"):
+def rewrite_utils(
+    saltext_path: Path,
+    saltext_name: str,
+    res: "Migration",
+    cache_dir: Optional[Path] = None,
+):
     """
     Rewrite the passed in paths
     """
-    fixer = UtilsMigrator(saltext_name=saltext_name, saltext_path=saltext_path, res=res)
+    fixer = UtilsMigrator(
+        saltext_name=saltext_name,
+        saltext_path=saltext_path,
+        res=res,
+        cache_dir=cache_dir,
+    )
     (
         Query(saltext_path / "src")
-        .select(
-            """
-            (
-                dunder_call=power<
-                    '__utils__'
-                    trailer< '[' dunder_mod_func=any* ']' >
-                    trailer< '(' function_arguments=any* ')' >
-                    trailing=any*
-                >
-            )
-            """
-        )
+        .select(DUNDER_UTILS_PATTERN)
         .modify(fixer.fix_dunder_utils_calls)
         .execute(write=True, interactive=False, silent=False)
     )